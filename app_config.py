@@ -15,20 +15,59 @@ Usage:
 
 import yaml
 from enum import Enum
+from functools import lru_cache
 from typing import Any, Optional, Union
 
+# Prefer the LibYAML C bindings when available, fall back to pure Python
+try:
+    from yaml import CSafeLoader as _Loader, CSafeDumper as _Dumper
+except ImportError:
+    from yaml import SafeLoader as _Loader, SafeDumper as _Dumper
+
 
 class ConfigKeys(Enum):
     """Type-safe configuration keys enum."""
     DIR_DATA_INPUTS = "directories.data.inputs"
     DIR_DATA_STAGING= "directories.data.staging"
     DIR_DATA_OUTPUTS= "directories.data.outputs"
+    DIR_DATA_CACHE = "directories.data.cache"
+    OUTPUT_WRITE_EXCEL = "outputs.excel.enabled"
+
+
+# Split key paths for enum keys, computed once at import
+_KEY_PATHS: dict[ConfigKeys, tuple[str, ...]] = {
+    k: tuple(k.value.split('.')) for k in ConfigKeys
+}
 
 
 # Global config instance and file path
 _config: Optional[dict] = None
 _config_path: Optional[str] = None
 
+# Resolved values by dotted key, invalidated whenever the config changes
+_cache: dict[str, Any] = {}
+_MISSING = object()
+
+
+def _load(config_path: str) -> dict:
+    """
+    Load a YAML config file, validating its shape once up front.
+    
+    Args:
+        config_path: Path to the YAML configuration file
+        
+    Returns:
+        The loaded configuration dictionary
+        
+    Raises:
+        RuntimeError: If the file does not contain a mapping
+    """
+    with open(config_path, 'r') as f:
+        data = yaml.load(f, Loader=_Loader)
+    if not isinstance(data, dict):
+        raise RuntimeError(f"Config file '{config_path}' is not a dictionary - invalid state")
+    return data
+
 
 def init_config(config_path: str = "app_config.yaml") -> Any:
     """
@@ -43,11 +82,12 @@ def init_config(config_path: str = "app_config.yaml") -> Any:
     Raises:
         FileNotFoundError: If the config file doesn't exist
         yaml.YAMLError: If the YAML file is malformed
+        RuntimeError: If the YAML file is not a mapping
     """
     global _config, _config_path
     if _config is None:
-        with open(config_path, 'r') as f:
-            _config = yaml.safe_load(f)
+        _cache.clear()
+        _config = _load(config_path)
         _config_path = config_path
     return _config
 
@@ -60,6 +100,25 @@ def _ensure_initialized() -> None:
         )
 
 
+@lru_cache(maxsize=None)
+def _resolve(key: Union[ConfigKeys, str]) -> str:
+    """Resolve a configuration key (enum or string) to its dotted string form."""
+    return key.value if isinstance(key, ConfigKeys) else key
+
+
+@lru_cache(maxsize=128)
+def _split_path(key_str: str) -> tuple[str, ...]:
+    """Split a raw dotted key string into its path segments."""
+    return tuple(key_str.split('.'))
+
+
+def _key_path(key: Union[ConfigKeys, str]) -> tuple[str, ...]:
+    """Get the path segments for a configuration key (enum or string)."""
+    if isinstance(key, ConfigKeys):
+        return _KEY_PATHS[key]
+    return _split_path(key)
+
+
 def _get(key: Union[ConfigKeys, str], default: Any = None) -> Any:
     """
     Private base getter with error handling.
@@ -75,10 +134,14 @@ def _get(key: Union[ConfigKeys, str], default: Any = None) -> Any:
         KeyError: If key is missing and no default provided
     """
     _ensure_initialized()
-    key_str = key.value if isinstance(key, ConfigKeys) else key
+    key_str = _resolve(key)
+
+    hit = _cache.get(key_str, _MISSING)
+    if hit is not _MISSING:
+        return hit
     
     # Handle nested keys with dot notation
-    keys = key_str.split('.')
+    keys = _key_path(key)
     value = _config
     
     try:
@@ -104,19 +167,19 @@ def _get(key: Union[ConfigKeys, str], default: Any = None) -> Any:
         
         return default
     
+    _cache[key_str] = value
     return value
 
 
-def _set_nested_value(data: dict, key_path: str, value: Any) -> None:
+def _set_nested_value(data: dict, keys: tuple[str, ...], value: Any) -> None:
     """
-    Set a nested value in a dictionary using dot notation.
+    Set a nested value in a dictionary using a split key path.
     
     Args:
         data: Dictionary to modify
-        key_path: Dot-separated key path (e.g., "database.host")
+        keys: Key path segments (e.g., ("database", "host"))
         value: Value to set
     """
-    keys = key_path.split('.')
     current = data
     
     # Navigate to the parent of the target key
@@ -132,17 +195,6 @@ def _set_nested_value(data: dict, key_path: str, value: Any) -> None:
     current[keys[-1]] = value
 
 
-def _get_config_data() -> dict:
-    """Get the underlying config data as a dictionary."""
-    _ensure_initialized()
-    
-    # Config is already a dictionary from YAML loading
-    if isinstance(_config, dict):
-        return _config
-    else:
-        raise RuntimeError("Config is not a dictionary - invalid state")
-
-
 def _set(key: Union[ConfigKeys, str], value: Any) -> None:
     """
     Private setter for configuration values.
@@ -152,10 +204,9 @@ def _set(key: Union[ConfigKeys, str], value: Any) -> None:
         value: Value to set
     """
     _ensure_initialized()
-    key_str = key.value if isinstance(key, ConfigKeys) else key
+    _cache.clear()
     
-    data = _get_config_data()
-    _set_nested_value(data, key_str, value)
+    _set_nested_value(_config, _key_path(key), value)
 
 
 def get_str(key: Union[ConfigKeys, str], default: str = "") -> str:
@@ -316,14 +367,31 @@ def set_list(key: Union[ConfigKeys, str], value: list) -> None:
     _set(key, value)
 
 
+def get_config_path() -> str:
+    """
+    Get the path the configuration was loaded from.
+    
+    Returns:
+        Path to the YAML configuration file
+        
+    Raises:
+        RuntimeError: If config not initialized
+    """
+    _ensure_initialized()
+    
+    if _config_path is None:
+        raise RuntimeError("No config file path available")
+    return _config_path
+
+
 def reload_config() -> None:
     """
     Reload configuration from file.
     """
     global _config
     if _config_path is not None:
-        with open(_config_path, 'r') as f:
-            _config = yaml.safe_load(f)
+        _cache.clear()
+        _config = _load(_config_path)
 
 
 def save() -> None:
@@ -340,8 +408,7 @@ def save() -> None:
         raise RuntimeError("No config file path available for saving")
     
     try:
-        data = _get_config_data()
         with open(_config_path, 'w') as f:
-            yaml.safe_dump(data, f, default_flow_style=False, sort_keys=False)
+            yaml.dump(_config, f, Dumper=_Dumper, default_flow_style=False, sort_keys=False)
     except Exception as e:
         raise IOError(f"Failed to save config to '{_config_path}': {e}")
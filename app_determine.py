@@ -1,63 +1,51 @@
+import logging
 import os
-import json
 from pathlib import Path
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
 
 import polars as pl
-from langchain_openai import ChatOpenAI
-from pydantic import SecretStr
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 
 import app_config
-from lib.files import get_staging_files, read_dataframe
+from lib.files import get_staging_files, read_lazyframe
+from lib.io_utils import write_json, write_text
 
+# langchain is imported lazily, only code paths that talk to an LLM pay for it
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
-llm_provider_url = os.getenv("OPENAI_API_URL")
-llm_provider_key = os.getenv("OPENAI_API_KEY")
 
-def get_chain_lite_rigid(): 
-    llm = get_llm(
-        model="qwen/qwen3-coder",
-        temperature=0,
-        top_p=1
-    )
-    parser = JsonOutputParser(pydantic_object=TableDeterminationResponse)
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are a robot, tasked with generating rigid structured JSON response"),
-        ("human", "{task}")
-    ])
+@lru_cache()
+def _llm_endpoint() -> tuple[Optional[str], Optional[str]]:
+    return os.getenv("OPENAI_API_URL"), os.getenv("OPENAI_API_KEY")
 
-    return prompt | llm | parser
 
-def get_chain_medium_rigid(): 
-    llm = get_llm(
-        model="anthropic/claude-sonnet-4",
-        temperature=0,
-        top_p=1
-    )
-    parser = JsonOutputParser(pydantic_object=TableDeterminationResponse)
-    prompt = ChatPromptTemplate.from_messages([
+# Built once and shared by every get_chain_* call
+@lru_cache(maxsize=1)
+def _rigid_prompt():
+    from langchain_core.prompts import ChatPromptTemplate
+
+    return ChatPromptTemplate.from_messages([
         ("system", "You are a robot, tasked with generating rigid structured JSON response"),
         ("human", "{task}")
     ])
 
-    return prompt | llm | parser
+@lru_cache(maxsize=1)
+def _rigid_parser():
+    from langchain_core.output_parsers import JsonOutputParser
 
-def get_chain_heavy_rigid(): 
-    llm = get_llm(
-        model="anthropic/claude-opus-4.1",
-        temperature=0,
-        top_p=1
-    )
-    parser = JsonOutputParser(pydantic_object=TableDeterminationResponse)
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are a robot, tasked with generating rigid structured JSON response"),
-        ("human", "{task}")
-    ])
+    return JsonOutputParser(pydantic_object=TableDeterminationResponse)
 
-    return prompt | llm | parser
+def get_chain_lite_rigid(): 
+    return _rigid_prompt() | _rigid_llm("qwen/qwen3-coder") | _rigid_parser()
+
+def get_chain_medium_rigid(): 
+    return _rigid_prompt() | _rigid_llm("anthropic/claude-sonnet-4") | _rigid_parser()
+
+def get_chain_heavy_rigid(): 
+    return _rigid_prompt() | _rigid_llm("anthropic/claude-opus-4.1") | _rigid_parser()
 
 resp_string = "SINGLE STRING RESPONSE: "
 class TableDeterminationResponse(BaseModel):
@@ -155,14 +143,18 @@ Provide only the column name, not a nested JSON.
 """
 
 
-def print_tables_summary(dataframes: list[tuple[str, pl.DataFrame]], n_rows: int = 5) -> str:
+def print_tables_summary(dataframes: list[tuple[str, pl.LazyFrame]], n_rows: int = 5) -> str:
     summary: list[str] = []
-    for filepath, df in dataframes:
+    for filepath, lf in dataframes:
+        # Only the row count, schema and head are needed, never the full frame
+        columns = lf.collect_schema().names()
+        height = lf.select(pl.len()).collect().item()
         summary.append(f"\n## Table: {filepath}")
-        summary.append(f"Shape: {df.shape[0]} rows, {df.shape[1]} columns")
-        summary.append(f"Column Detail: {df.columns}")
-        summary.append(f"First {n_rows} rows:")
-        summary.append(str(df.head(n_rows)))
+        summary.append(f"Shape: {height} rows, {len(columns)} columns")
+        summary.append(f"Column Detail: {', '.join(columns)}")
+        summary.append(f"First {n_rows} rows (CSV):")
+        # Rust CSV writer rather than the box-drawing pretty printer
+        summary.append(lf.head(n_rows).collect(engine="streaming").write_csv())
     return "\n".join(summary)
 
 def get_llm(
@@ -170,7 +162,11 @@ def get_llm(
     temperature: float = 0.2,
     top_p: int = 1,
     model_kwargs: dict[str, float | int] = {}
-) -> ChatOpenAI:
+) -> "ChatOpenAI":
+    from langchain_openai import ChatOpenAI
+    from pydantic import SecretStr
+
+    llm_provider_url, llm_provider_key = _llm_endpoint()
     return ChatOpenAI(
         base_url=llm_provider_url,
         api_key=SecretStr(llm_provider_key) if llm_provider_key else None,
@@ -181,53 +177,67 @@ def get_llm(
     )
 
 
+# One client per model, so its HTTP connection pool is reused across chains
+@lru_cache(maxsize=None)
+def _rigid_llm(model: str) -> "ChatOpenAI":
+    return get_llm(model=model, temperature=0, top_p=1)
+
+
 def determine_tables() -> None:
     output_dir = Path(app_config.get_str(app_config.ConfigKeys.DIR_DATA_OUTPUTS))
 
     print("Reading staging files")
     staging_files = [
-        (filepath, df)
+        (filepath, lf)
         for filepath in get_staging_files()
-        if (df := read_dataframe("Staging", filepath)) is not None
+        if (lf := read_lazyframe("Staging", filepath)) is not None
     ]
 
-    print("Writing Table Summary")
     tables_summary = print_tables_summary(staging_files)
-    with open(output_dir / "tables_summary.txt", "w") as f:
-        f.write(tables_summary)
-        f.close()
-
-    print("LLM Determining Tables")
-    chain = get_chain_lite_rigid()
-    tables_json = chain.invoke({
-        "task": prompt_task_determine_tables + "\n" + tables_summary
-    })
+
+    # Overlap the summary write and heavy chain setup with the first LLM call,
+    # the waterfall call itself still depends on the tables response
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        print("Writing Table Summary")
+        summary_write = executor.submit(
+            write_text, output_dir / "tables_summary.txt", tables_summary
+        )
+        heavy_chain_future = executor.submit(get_chain_heavy_rigid)
+
+        print("LLM Determining Tables")
+        chain = get_chain_lite_rigid()
+        tables_json = chain.invoke({
+            "task": prompt_task_determine_tables + "\n" + tables_summary
+        })
+
+        summary_write.result()
 
     # Filter to key tables only
     key_files = [tables_json["invoice_line_items"], tables_json["product_master"], tables_json["customer_master"]]
-    key_files = [f for f in key_files if f]  # Remove nulls
+    # Exact match on stem, so "sales" and "sales.parquet" both resolve but partials don't
+    key_stems = {Path(f).stem for f in key_files if f}  # Remove nulls
     
     filtered_staging_files = [
-        (filepath, df) for filepath, df in staging_files 
-        if any(key_file in filepath for key_file in key_files)
+        (filepath, lf) for filepath, lf in staging_files 
+        if Path(filepath).stem in key_stems
     ]
     
     filtered_tables_summary = print_tables_summary(filtered_staging_files)
 
     print("LLM Determining Waterfall")
-    chain = get_chain_heavy_rigid()
+    chain = heavy_chain_future.result()
     waterfall_json = chain.invoke({
         "task": prompt_task_determine_waterfall + "\n" + filtered_tables_summary
     })
 
     print("Writing JSON Output")
-    with open(output_dir / "determinations.json", "w") as f:
-        json.dump({
-            "tables": tables_json,
-            "waterfall": waterfall_json
-        }, f, indent=2)
+    write_json(output_dir / "determinations.json", {
+        "tables": tables_json,
+        "waterfall": waterfall_json
+    })
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
     app_config.init_config("app_config.yaml")
     determine_tables()
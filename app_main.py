@@ -1,115 +1,149 @@
-from lib.stage import stagefiles_refresh
-from lib.files import get_staging_files, read_dataframe
 from pathlib import Path
+from typing import Optional
+from collections import defaultdict
 import app_config
-import polars as pl
-import json
-import importlib.util
+import importlib
+import logging
 import shutil
 
 
+log = logging.getLogger("edr")
+
+
 def load_column_determination():
-    spec = importlib.util.spec_from_file_location(
-        "column_determination", "lib/smarts/column_determination.py"
-    )
-    if spec and spec.loader:
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        return module.find_ranked_composite_keys
-    return None
+    # Standard import machinery caches the module in sys.modules after first load
+    try:
+        module = importlib.import_module("lib.smarts.column_determination")
+    except ImportError:
+        return None
+    return module.find_ranked_composite_keys
 
 
 def clear_output_directory():
     output_dir = Path(app_config.get_str(app_config.ConfigKeys.DIR_DATA_OUTPUTS))
     if output_dir.exists():
-        print(f"Clearing output directory: {output_dir}")
+        log.info("Clearing output directory: %s", output_dir)
         shutil.rmtree(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
-    print(f"Created clean output directory: {output_dir}")
+    log.info("Created clean output directory: %s", output_dir)
 
 
-def process_staging_files():
+EXCEL_MAX_CELLS = 10_000_000
+
+
+def _process_one(filename: str) -> Optional[dict]:
+    # Deferred so the parent and freshly spawned workers import cheaply
+    import polars as pl
+    from lib.files import read_lazyframe
+    from lib.io_utils import write_json
+
+    output_dir = Path(app_config.get_str(app_config.ConfigKeys.DIR_DATA_OUTPUTS))
+
+    lf = read_lazyframe("Staging", filename)
+    if lf is None:
+        return None
+
+    log.info("Processing %s", filename)
+
+    df = lf.collect(engine="streaming")
+
+    # Evenly spaced rows rather than a random sample, no RNG or permutation
+    base_name = Path(filename).stem
+    n_sample = min(10_000, df.height)
+    step = max(1, df.height // max(1, n_sample))
+    sample_df = df.gather_every(step).head(n_sample)
+    if not app_config.get_bool(app_config.ConfigKeys.OUTPUT_WRITE_EXCEL, True):
+        log.info("  Excel Sample disabled in config")
+    elif sample_df.width * sample_df.height > EXCEL_MAX_CELLS:
+        # xlsxwriter is pure Python, too slow for very wide samples
+        parquet_path = output_dir / f"{base_name}_sample.parquet"
+        log.info("  Excel skipped for size, writing Parquet Sample to %s", parquet_path)
+        sample_df.write_parquet(str(parquet_path))
+    else:
+        log.info("  Writing Excel Sample")
+        excel_path = output_dir / f"{base_name}_sample.xlsx"
+        sample_df.write_excel(str(excel_path))
+
+    # Write CSV files in batches of 999,999 rows from the in-memory frame,
+    # slices are zero-copy views so nothing is re-read from the parquet
+    batch_size = 999_999
+    if df.height <= batch_size:
+        csv_path = output_dir / f"{base_name}.csv"
+        log.info("  Writing CSV to %s", csv_path)
+        df.write_csv(str(csv_path))
+    else:
+        log.info("  Writing CSV in batches of %s rows", f"{batch_size:,}")
+        for i, df_batch in enumerate(df.iter_slices(batch_size)):
+            csv_path = output_dir / f"{base_name}_{i:03}.csv"
+            log.info("    Writing batch %d to %s", i, csv_path)
+            df_batch.write_csv(str(csv_path))
+
+    # Analyze composite keys
+    log.info("  Analyzing composite keys")
     find_ranked_composite_keys = load_column_determination()
-    if not find_ranked_composite_keys:
-        print("Could not load column determination module")
+    key_columns = find_ranked_composite_keys(df)
+
+    # Get describe stats for numeric and date columns from the in-memory frame
+    describe_lf = df.lazy().select(pl.selectors.numeric() | pl.selectors.temporal())
+    if describe_lf.collect_schema().len() > 0:
+        stats_dict = describe_lf.describe().to_dict(as_series=False)
+        # Restructure to be more readable: {column: {stat: value}}
+        describe_stats = {}
+        for col in stats_dict:
+            if col != "statistic":
+                describe_stats[col] = dict(
+                    zip(stats_dict["statistic"], stats_dict[col])
+                )
+    else:
+        describe_stats = {}
+
+    # Group columns by type, straight from the schema
+    columns_by_type = defaultdict(list)
+    for col, dtype in df.schema.items():
+        # Enum dtypes print their full category list, group them by kind instead
+        type_name = "Enum" if isinstance(dtype, pl.Enum) else str(dtype)
+        columns_by_type[type_name].append(col)
+
+    # Create report
+    report = {
+        "filename": filename,
+        "total_rows": df.height,
+        "total_columns": df.width,
+        "key_columns": key_columns,
+        "columns_by_type": dict(columns_by_type),
+        "column_stats": describe_stats,
+    }
+
+    # Write report JSON
+    report_filename = "Report_" + Path(filename).stem + ".json"
+    report_path = output_dir / report_filename
+    log.info("  Writing report to %s", report_path)
+    write_json(report_path, report)
+
+    return report
+
+
+def process_staging_files():
+    from lib.files import get_staging_files, map_files_in_workers
+
+    if not load_column_determination():
+        log.error("Could not load column determination module")
         return
 
     staging_files = get_staging_files()
-    output_dir = Path(app_config.get_str(app_config.ConfigKeys.DIR_DATA_OUTPUTS))
+    if not staging_files:
+        return
 
-    for filename in staging_files:
-        df = read_dataframe("Staging", filename)
-        if df is not None:
-            print(f"Processing {filename}")
-
-            print("  Writing Excel Sample")
-            base_name = Path(filename).stem
-            excel_filename = f"{base_name}_sample.xlsx"
-            excel_path = output_dir / excel_filename
-            sample_df = df.sample(min(10_000, df.height))
-            sample_df.write_excel(str(excel_path))
-
-            # Write CSV files in batches of 999,999 rows
-            batch_size = 999_999
-            if df.height <= batch_size:
-                csv_path = output_dir / f"{base_name}.csv"
-                print(f"  Writing CSV to {csv_path}")
-                df.write_csv(str(csv_path))
-            else:
-                print(f"  Writing CSV in batches of {batch_size:,} rows")
-                for i, df_batch in enumerate(df.iter_slices(batch_size)):
-                    csv_path = output_dir / f"{base_name}_{i:03}.csv"
-                    print(f"    Writing batch {i} to {csv_path}")
-                    df_batch.write_csv(str(csv_path))
-
-            # Analyze composite keys
-            print("  Analyzing composite keys")
-            key_columns = find_ranked_composite_keys(df)
-
-            # Get describe stats for numeric and date columns
-            describe_df = df.select(pl.selectors.numeric() | pl.selectors.temporal())
-            if describe_df.width > 0:
-                stats_dict = describe_df.describe().to_dict(as_series=False)
-                # Restructure to be more readable: {column: {stat: value}}
-                describe_stats = {}
-                for col in stats_dict:
-                    if col != "statistic":
-                        describe_stats[col] = dict(
-                            zip(stats_dict["statistic"], stats_dict[col])
-                        )
-            else:
-                describe_stats = {}
-
-            # Group columns by type
-            columns_by_type = {}
-            for col, dtype in zip(df.columns, df.dtypes):
-                type_name = str(dtype)
-                if type_name not in columns_by_type:
-                    columns_by_type[type_name] = []
-                columns_by_type[type_name].append(col)
-
-            # Create report
-            report = {
-                "filename": filename,
-                "total_rows": df.height,
-                "total_columns": df.width,
-                "key_columns": key_columns,
-                "columns_by_type": columns_by_type,
-                "column_stats": describe_stats,
-            }
-
-            # Write report JSON
-            report_filename = "Report_" + Path(filename).stem + ".json"
-            report_path = output_dir / report_filename
-            print(f"  Writing report to {report_path}")
-            with open(report_path, "w") as f:
-                json.dump(report, f, indent=2)
+    list(map_files_in_workers(_process_one, staging_files))
 
 
 if __name__ == "__main__":
+    from lib.stage import stagefiles_refresh
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
     app_config.init_config("app_config.yaml")
-    print("Refreshing Stage Files")
+    log.info("Refreshing Stage Files")
     stagefiles_refresh()
     clear_output_directory()
-    print("Processing Stage Files to Output")
+    log.info("Processing Stage Files to Output")
     process_staging_files()
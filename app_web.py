@@ -1,3 +1,5 @@
+import logging
+
 import streamlit as st
 import polars as pl
 from pygwalker.api.streamlit import StreamlitRenderer
@@ -7,11 +9,13 @@ from lib.stage import stagefiles_ensure, stagefiles_refresh
 
 
 def run_pyg(df: pl.DataFrame):
-    pyg_app = StreamlitRenderer(df)
+    # Aggregations run in-process over the Arrow buffers, not in the browser
+    pyg_app = StreamlitRenderer(df, kernel_computation=True)
     pyg_app.explorer()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
     app_config.init_config("app_config.yaml")
     stagefiles_ensure()
 
@@ -1,15 +1,30 @@
+import logging
+import re
+from typing import Any
+
 import polars as pl
 
 
-def df_clean_all(df: pl.DataFrame) -> pl.DataFrame:
+log = logging.getLogger(__name__)
+
+
+def df_clean_all(df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame:
+    # Build a single lazy plan so Polars can fuse the cleaning passes,
+    # scans passed straight in get projection pushdown into the reader
+    lf = df.lazy()
+
     # Clean column names
-    df = df_clean_columns(df)
+    lf = df_clean_columns(lf)
+
+    # Clean row/column data, materialized once so the type probes below
+    # read memory instead of re-running the scan and null-token pass
+    lf = df_clean_contents(lf)
 
-    # Clean row/column data
-    df = df_clean_contents(df)
+    # Redetermine types now df is clean, frames with nothing to probe skip it
+    lf = redetermine_types(lf)
 
-    # Redetermine types now df is clean
-    df = redetermine_types(df)
+    # Apply the casts, then shrink numeric dtypes to fit the data
+    df = shrink_dtypes(lf.collect())
 
     # Return final result
     return df
@@ -48,169 +63,303 @@ UNSAFE_COLUMN_GENERAL_CHARS: list[str] = [
     "\\",
 ]
 
+# Single-pass sanitizers built from the character lists above
+_SPACE_TRANS = str.maketrans(
+    {char: SAFE_COLUMN_SPACE_CHAR for char in UNSAFE_COLUMN_SPACE_CHARS}
+)
+_UNSAFE_CHARS_RE = re.compile(
+    "[" + re.escape("".join(UNSAFE_COLUMN_GENERAL_CHARS)) + "]"
+)
 
-def df_clean_columns(df: pl.DataFrame) -> pl.DataFrame:
-    print("Cleaning Columns")
-    cols_clean = []
-    for col_name in df.columns:
-        # strip whitespace outer ends
-        sanitized = col_name.strip()
 
-        # replace inner spaces with chosen separator
-        for char in UNSAFE_COLUMN_SPACE_CHARS:
-            sanitized = sanitized.replace(char, SAFE_COLUMN_SPACE_CHAR)
+def df_clean_columns(lf: pl.LazyFrame) -> pl.LazyFrame:
+    log.debug("Cleaning Columns")
+    columns = lf.collect_schema().names()
+    # strip outer whitespace, swap inner spaces for separator, purge unsupported chars
+    cols_clean = [
+        _UNSAFE_CHARS_RE.sub("", col_name.strip().translate(_SPACE_TRANS))
+        for col_name in columns
+    ]
 
-        # purge unsupported chars
-        for char in UNSAFE_COLUMN_GENERAL_CHARS:
-            sanitized = sanitized.replace(char, "")
-
-        cols_clean.append(sanitized)
-
-    return df.rename(dict(zip(df.columns, cols_clean)))
+    return lf.rename(dict(zip(columns, cols_clean)))
 
 
 NULL_VALUE_STRINGS = ["*", "N/A", "N.A.", "#N/A", "???", "NULL", "null"]
+# Built once, exact-match tokens, so substring matchers don't apply.
+# Imploded to a single list value, a bare Series of the same dtype is ambiguous
+_NULL_VALUE_SERIES = pl.Series(
+    "null_values", NULL_VALUE_STRINGS, dtype=pl.Utf8
+).implode()
 
 
-def df_clean_contents(df: pl.DataFrame) -> pl.DataFrame:
-    print("Cleaning null-ish values")
-    string_columns = [col for col in df.columns if df[col].dtype == pl.Utf8]
+def df_clean_contents(lf: pl.LazyFrame) -> pl.LazyFrame:
+    log.debug("Cleaning null-ish values")
+    schema = lf.collect_schema()
+    string_columns = [col for col, dtype in schema.items() if dtype == pl.Utf8]
     if string_columns:
-        df = df.with_columns(
+        # Vectorized null-token match, no per-cell Python round trip
+        stripped = [pl.col(col).str.strip_chars() for col in string_columns]
+        lf = lf.with_columns(
             [
-                pl.col(col)
-                .str.strip_chars()  # Remove leading/trailing whitespace
-                .map_elements(
-                    lambda x: None if x and x in NULL_VALUE_STRINGS else x,
-                    return_dtype=pl.Utf8,
-                )
-                for col in string_columns
+                pl.when(value.is_in(_NULL_VALUE_SERIES))
+                .then(pl.lit(None, dtype=pl.Utf8))
+                .otherwise(value)
+                .alias(col)
+                for col, value in zip(string_columns, stripped)
             ]
         )
 
-    print("Dropping rows with all-null values")
-    df = df.filter(~pl.all_horizontal(pl.all().is_null()))
+    log.debug("Dropping rows with all-null values")
+    lf = lf.filter(pl.any_horizontal(pl.all().is_not_null()))
 
-    print("Dropping columns with all-null values")
-    df = df.select([col for col in df.columns if not df[col].is_null().all()])
+    # Every later probe would otherwise re-run the plan from the source
+    df = lf.collect(engine="streaming")
 
-    return df
+    log.debug("Dropping columns with all-null values")
+    # null_count only reads validity bitmaps, one parallel pass for all columns
+    all_null = df.select(pl.all().null_count() == pl.len()).row(0, named=True)
 
+    return df.lazy().select(
+        [col for col, is_empty in all_null.items() if not is_empty]
+    )
 
-def redetermine_types(df: pl.DataFrame) -> pl.DataFrame:
-    """Intelligently redetermine better data types for columns in dataframe"""
-    regex_parentheses_negative = r"^\s*\(([0-9,.]+)\)\s*$"
-    regex_currency_cleanup = r"[$¢£¥€₹₽¤,\s]"
 
-    print("Converting plain numeric strings to floats")
-    df = df.with_columns(
-        [
-            (
-                pl.col(col).cast(pl.Float64, strict=False)
-                if (
-                    df[col].dtype == pl.Utf8
-                    and df[col].cast(pl.Float64, strict=False).is_not_null().all()
-                )
-                else pl.col(col)
-            )
-            for col in df.columns
-        ]
-    )
+# Type inference probes run on at most this many leading rows
+INFERENCE_SAMPLE_ROWS: int = 1_000_000
 
-    print("Converting paranthesis-wrapped negative values to floats")
-    df = df.with_columns(
-        [
-            (
-                pl.col(col)
-                .str.replace_all(regex_parentheses_negative, r"-$1")
-                .str.replace_all(regex_currency_cleanup, "")
-                .cast(pl.Float64)
-                if (
-                    df[col].dtype == pl.Utf8
-                    and df[col].str.contains(regex_parentheses_negative).any()
-                )
-                else pl.col(col)
-            )
-            for col in df.columns
-        ]
+# Above this many distinct values a string column is never categorical
+CATEGORICAL_MAX_UNIQUE: int = 250
+
+REGEX_PARENTHESES_NEGATIVE = r"^\s*\(([0-9,.]+)\)\s*$"
+
+# Currency symbols, separators and whitespace stripped before a numeric cast,
+# matched as literals (Aho-Corasick) rather than through the regex engine
+CURRENCY_CHARS: list[str] = ["$", "¢", "£", "¥", "€", "₹", "₽", "¤", ","]
+# Unicode White_Space, the same set a regex \s class matches
+WHITESPACE_CHARS: list[str] = [
+    "\t", "\n", "\v", "\f", "\r", " ", "\u0085", "\u00a0", "\u1680",
+    *(chr(code) for code in range(0x2000, 0x200B)),
+    "\u2028", "\u2029", "\u202f", "\u205f", "\u3000",
+]
+_CURRENCY_STRIP = {char: "" for char in CURRENCY_CHARS + WHITESPACE_CHARS}
+
+
+def _as_float(col: str) -> pl.Expr:
+    return pl.col(col).cast(pl.Float64, strict=False)
+
+
+def _parentheses_as_float(col: str, strict: bool = True) -> pl.Expr:
+    return (
+        pl.col(col)
+        .str.replace_all(REGEX_PARENTHESES_NEGATIVE, r"-$1")
+        .str.replace_many(_CURRENCY_STRIP)
+        .cast(pl.Float64, strict=strict)
     )
 
-    print("Converting currency-formatted values to floats")
-    df = df.with_columns(
-        [
-            (
-                pl.col(col).str.replace_all(regex_currency_cleanup, "").cast(pl.Float64)
-                if (
-                    df[col].dtype == pl.Utf8
-                    and df[col]
-                    .str.replace_all(regex_currency_cleanup, "")
-                    .cast(pl.Float64, strict=False)
-                    .is_not_null()
-                    .all()
-                )
-                else pl.col(col)
-            )
-            for col in df.columns
-        ]
+
+def _currency_as_float(col: str, strict: bool = True) -> pl.Expr:
+    return (
+        pl.col(col)
+        .str.replace_many(_CURRENCY_STRIP)
+        .cast(pl.Float64, strict=strict)
     )
 
-    print("Converting whole-number floats to integers")
-    df = df.with_columns(
-        [
-            (
-                pl.col(col).cast(pl.Int64)
-                if (df[col].dtype == pl.Float64 and (df[col] == df[col].floor()).all())
-                else pl.col(col)
-            )
-            for col in df.columns
-        ]
+
+def _as_date(col: str) -> pl.Expr:
+    return pl.col(col).cast(pl.Utf8).str.to_date("%Y-%m-%d", strict=False)
+
+
+def _is_whole(expr: pl.Expr) -> pl.Expr:
+    return (expr == expr.floor()).all()
+
+
+def _as_int(expr: pl.Expr, strict: bool = True) -> pl.Expr:
+    if strict:
+        return expr.cast(pl.Int64)
+    # A non-strict float cast would truncate fractions, null them instead
+    return pl.when(expr == expr.floor()).then(expr).cast(pl.Int64, strict=False)
+
+
+def _profile_columns(
+    lf: pl.LazyFrame, probes: dict[str, dict[str, pl.Expr]]
+) -> tuple[int, dict[str, dict[str, Any]]]:
+    """Evaluate the row count and every per-column probe in a single pass"""
+    flat = [
+        (col, name, expr)
+        for col, col_probes in probes.items()
+        for name, expr in col_probes.items()
+    ]
+    row = (
+        lf.select(
+            [pl.len().alias("height")]
+            + [expr.alias(f"probe_{i}") for i, (_, _, expr) in enumerate(flat)]
+        )
+        .collect()
+        .row(0)
     )
 
-    print("Converting date strings to date types")
-    df = df.with_columns(
-        [
-            (
-                pl.col(col).cast(pl.Utf8).str.to_date("%Y-%m-%d", strict=False)
-                if (
-                    df[col].dtype in [pl.Utf8, pl.Categorical]
-                    and df[col]
-                    .cast(pl.Utf8)
-                    .str.to_date("%Y-%m-%d", strict=False)
-                    .is_not_null()
-                    .all()
-                )
-                else pl.col(col)
-            )
-            for col in df.columns
-        ]
+    # Regroup into {column: {probe: value}} metadata
+    metadata: dict[str, dict[str, Any]] = {col: {} for col in probes}
+    for (col, name, _), value in zip(flat, row[1:]):
+        metadata[col][name] = value
+    return row[0], metadata
+
+
+def redetermine_types(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """Intelligently redetermine better data types for columns in dataframe"""
+    schema = lf.collect_schema()
+    utf8_cols = [col for col, dtype in schema.items() if dtype == pl.Utf8]
+    float_cols = [col for col, dtype in schema.items() if dtype == pl.Float64]
+    categorical_cols = [col for col, dtype in schema.items() if dtype == pl.Categorical]
+    if not (utf8_cols or float_cols or categorical_cols):
+        return lf
+
+    # Every stage decision comes from one profiling pass over the clean frame,
+    # the stages themselves are then chained lazily without materializing
+    log.debug("Profiling columns for type inference")
+    probes: dict[str, dict[str, pl.Expr]] = {}
+    for col in utf8_cols:
+        # Each parse is built once and shared by its probes, so the optimizer
+        # evaluates the common subexpression a single time per column
+        as_float = _as_float(col)
+        as_currency = _currency_as_float(col, False)
+        probes[col] = {
+            "float_ok": as_float.is_not_null().all(),
+            "float_whole": _is_whole(as_float),
+            "paren_any": pl.col(col).str.contains(REGEX_PARENTHESES_NEGATIVE).any(),
+            "currency_ok": as_currency.is_not_null().all(),
+            "currency_whole": _is_whole(as_currency),
+            "n_unique": pl.col(col).n_unique(),
+        }
+    for col in utf8_cols + categorical_cols:
+        probes.setdefault(col, {})["date_ok"] = _as_date(col).is_not_null().all()
+    for col in float_cols:
+        probes[col] = {"whole": _is_whole(pl.col(col))}
+    # Large frames are typed from their leading rows alone
+    sample = lf.head(INFERENCE_SAMPLE_ROWS)
+    height, meta = _profile_columns(sample, probes)
+    # Probes over every row guarantee the casts succeed, so they stay strict.
+    # Sampled casts are non-strict and confirmed against every row below
+    strict = height < INFERENCE_SAMPLE_ROWS
+
+    # Each column's target is decided up front from the probes, so every
+    # conversion below lands in a single with_columns instead of one per stage
+    casts: dict[str, pl.Expr] = {}
+
+    log.debug("Converting plain numeric strings to floats")
+    plain_cols = [col for col in utf8_cols if meta[col]["float_ok"]]
+    for col in plain_cols:
+        casts[col] = _as_float(col)
+
+    log.debug("Converting paranthesis-wrapped negative values to floats")
+    remaining = [col for col in utf8_cols if col not in plain_cols]
+    paren_candidates = [col for col in remaining if meta[col]["paren_any"]]
+    if paren_candidates:
+        # The regex rewrite is costly, so its probes only run for the few
+        # columns that hold a parenthesised negative at all
+        paren_probes = {}
+        for col in paren_candidates:
+            as_paren = _parentheses_as_float(col, False)
+            paren_probes[col] = {
+                "paren_ok": as_paren.null_count() == pl.col(col).null_count(),
+                "paren_whole": _is_whole(as_paren),
+            }
+        _, paren_meta = _profile_columns(sample, paren_probes)
+        for col in paren_candidates:
+            meta[col].update(paren_meta[col])
+    # One "(5)" in a free-text column isn't enough, every value must parse
+    paren_cols = [col for col in paren_candidates if meta[col]["paren_ok"]]
+    for col in paren_cols:
+        casts[col] = _parentheses_as_float(col, strict)
+
+    log.debug("Converting currency-formatted values to floats")
+    remaining = [col for col in remaining if col not in paren_cols]
+    currency_cols = [col for col in remaining if meta[col]["currency_ok"]]
+    for col in currency_cols:
+        casts[col] = _currency_as_float(col, strict)
+
+    log.debug("Converting date strings to date types")
+    remaining = [col for col in remaining if col not in currency_cols]
+    date_cols = [
+        col for col in remaining + categorical_cols if meta[col]["date_ok"]
+    ]
+    for col in date_cols:
+        casts[col] = _as_date(col)
+
+    whole_cols = (
+        [col for col in float_cols if meta[col]["whole"]]
+        + [col for col in plain_cols if meta[col]["float_whole"]]
+        + [col for col in paren_cols if meta[col]["paren_whole"]]
+        + [col for col in currency_cols if meta[col]["currency_whole"]]
     )
 
-    print("Converting low-cardinality strings to categoricals")
-    df = df.with_columns(
-        [
-            (
-                pl.col(col).cast(pl.Categorical)
-                if (
-                    df[col].dtype == pl.Utf8
-                    and df[col].n_unique() <= min(250, df.height * 0.10)
-                )
-                else pl.col(col)
+    if not strict:
+        # Rows past the sample never met the probes, so a cast that nulls
+        # more values than the source held falls back to the column as it was
+        log.debug("Confirming sampled conversions against full frame")
+        confirm: dict[str, dict[str, pl.Expr]] = {}
+        for col, expr in casts.items():
+            confirm[col] = {"cast_ok": expr.null_count() == pl.col(col).null_count()}
+        for col in whole_cols:
+            as_int = _as_int(casts.get(col, pl.col(col)), False)
+            confirm.setdefault(col, {})["whole_ok"] = (
+                as_int.null_count() == pl.col(col).null_count()
             )
-            for col in df.columns
+        # Also yields the full row count for the enum limit below
+        height, confirmed = _profile_columns(lf, confirm)
+        for col, col_meta in confirmed.items():
+            if not col_meta.get("cast_ok", True):
+                del casts[col]
+        whole_cols = [
+            col
+            for col in whole_cols
+            if confirmed[col]["whole_ok"] and confirmed[col].get("cast_ok", True)
         ]
-    )
 
-    print("Shrinking integer and float dtypes for optimal compression")
+    log.debug("Converting whole-number floats to integers")
+    for col in whole_cols:
+        casts[col] = _as_int(casts.get(col, pl.col(col)), strict)
+
+    log.debug("Converting low-cardinality strings to enums")
+    remaining = [col for col in utf8_cols if col not in casts]
+    categorical_limit = min(CATEGORICAL_MAX_UNIQUE, height * 0.10)
+    # A sample never holds more distinct values than the full column, so
+    # only the columns passing on it need their full count confirmed
+    enum_cols = [col for col in remaining if meta[col]["n_unique"] <= categorical_limit]
+    if enum_cols:
+        # Fixed per-column dictionary, avoids the global categorical string cache
+        _, domains = _profile_columns(
+            lf,
+            {
+                col: {
+                    "n_unique": pl.col(col).n_unique(),
+                    "domain": pl.col(col).drop_nulls().unique().sort().implode(),
+                }
+                for col in enum_cols
+            },
+        )
+        for col in enum_cols:
+            if domains[col]["n_unique"] <= categorical_limit:
+                casts[col] = pl.col(col).cast(pl.Enum(domains[col]["domain"]))
+
+    if casts:
+        lf = lf.with_columns([expr.alias(col) for col, expr in casts.items()])
+
+    return lf
+
+
+def shrink_dtypes(df: pl.DataFrame) -> pl.DataFrame:
+    """Shrink numeric dtypes and buffers to fit the materialized data"""
+    log.debug("Shrinking integer and float dtypes for optimal compression")
     df = df.with_columns(
         [
             df[col].shrink_dtype().alias(col)
-            for col in df.columns
-            if df[col].dtype
-            in [pl.Int64, pl.Int32, pl.Int16, pl.Int8, pl.Float64, pl.Float32]
+            for col, dtype in df.schema.items()
+            if dtype in [pl.Int64, pl.Int32, pl.Int16, pl.Int8, pl.Float64, pl.Float32]
         ]
     )
 
-    print("Shrinking memory allocation")
+    log.debug("Shrinking memory allocation")
     df = df.shrink_to_fit()
 
     return df
@@ -1,92 +1,270 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
 import polars as pl
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Optional
-import openpyxl
+from typing import Callable, Iterator, Optional, TypeVar
+import fastexcel
 import app_config
 from lib.cleaning.dataframes import df_clean_all
+from lib.io_utils import read_json, write_json
+
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+# Digest of the extraction and cleaning source, any edit to either module
+# invalidates the cache without a hand-maintained version to bump
+_EXTRACT_CODE_DIGEST = hashlib.blake2b(
+    b"".join(
+        Path(path).read_bytes()
+        for path in (__file__, df_clean_all.__code__.co_filename)
+    )
+).hexdigest()[:16]
+
+# Cache entries are <key>.json plus one <key>_<n>.parquet per table
+_EXTRACT_CACHE_FILE_RE = re.compile(r"^([0-9a-f]{16})(?:_\d+\.parquet|\.json)$")
+
+
+def _extract_cache_key(filepath: str) -> str:
+    stat = os.stat(filepath)
+    raw = f"{_EXTRACT_CODE_DIGEST}:{Path(filepath).resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+    return hashlib.blake2b(raw.encode()).hexdigest()[:16]
+
+
+def prune_extract_cache(filepaths: list[str]) -> None:
+    """Delete cached tables whose key matches none of the given input files"""
+    cache_dir = app_config.get_str(app_config.ConfigKeys.DIR_DATA_CACHE, "")
+    if not cache_dir:
+        return
+
+    live_keys = set()
+    for filepath in filepaths:
+        try:
+            live_keys.add(_extract_cache_key(filepath))
+        except OSError:
+            continue
+
+    try:
+        with os.scandir(cache_dir) as entries:
+            stale = [
+                entry.path
+                for entry in entries
+                if (match := _EXTRACT_CACHE_FILE_RE.match(entry.name))
+                and match.group(1) not in live_keys
+            ]
+    except FileNotFoundError:
+        return
+
+    for path in stale:
+        try:
+            os.remove(path)
+        except OSError as e:
+            log.warning("Failed pruning cache file %s: %s", path, e)
+    if stale:
+        log.info("Pruned %d stale cache files", len(stale))
 
 
 def extract_dataframes(filepath: str) -> list[tuple[pl.DataFrame, str]]:
+    """Extract and clean every table in a file, reusing cached results when the file is unchanged"""
+    return list(iter_dataframes(filepath))
+
+
+def iter_dataframes(filepath: str) -> Iterator[tuple[pl.DataFrame, str]]:
+    """Yield each cleaned table as soon as it is ready, reusing cached results when the file is unchanged"""
+    cache_dir = app_config.get_str(app_config.ConfigKeys.DIR_DATA_CACHE, "")
     filename = Path(filepath).name
-    results: list[tuple[pl.DataFrame, str]] = []
+    if not cache_dir or filename.startswith("~$"):
+        yield from _extract_dataframes(filepath)
+        return
+
+    key = _extract_cache_key(filepath)
+    cache_path = Path(cache_dir)
+    index_path = cache_path / f"{key}.json"
+
+    if index_path.exists():
+        try:
+            names = read_json(index_path)
+            results = [
+                (pl.read_parquet(cache_path / f"{key}_{i}.parquet"), name)
+                for i, name in enumerate(names)
+            ]
+            log.info("Loaded %d cached tables for %s", len(results), filename)
+            yield from results
+            return
+        except Exception as e:
+            log.warning("Failed reading cache for %s: %s", filename, e)
+
+    names = []
+    cache_ok = True
+    for df, name in _extract_dataframes(filepath):
+        if cache_ok:
+            try:
+                cache_path.mkdir(parents=True, exist_ok=True)
+                df.write_parquet(
+                    cache_path / f"{key}_{len(names)}.parquet",
+                    compression="zstd",
+                    statistics=True,
+                )
+            except Exception as e:
+                log.warning("Failed writing cache for %s: %s", filename, e)
+                cache_ok = False
+        names.append(name)
+        yield df, name
+
+    # Index goes last, so a partially written entry is never treated as a hit
+    if cache_ok:
+        try:
+            write_json(index_path, names)
+        except Exception as e:
+            log.warning("Failed writing cache for %s: %s", filename, e)
+
+
+def _extract_dataframes(filepath: str) -> Iterator[tuple[pl.DataFrame, str]]:
+    filename = Path(filepath).name
+    # CSV and parquet stay lazy scans until cleaning collects them
+    results: list[tuple[pl.DataFrame | pl.LazyFrame, str]] = []
 
     if filename.startswith("~$"):
-        return results
+        return
 
     extension = Path(filepath).suffix.lower()
 
     if extension in [".xlsx", ".xls"]:
-        print("Parsing excel file: " + filename)
+        log.info("Parsing excel file: %s", filename)
 
         try:
-            workbook = openpyxl.load_workbook(filepath, read_only=True)
-            sheets = workbook.sheetnames
+            # Read the file once, discovery and every sheet parse share the bytes
+            workbook = Path(filepath).read_bytes()
+            # Sheet names only, read from the workbook metadata by calamine
+            sheets = fastexcel.read_excel(workbook).sheet_names
         except Exception as e:
-            print(f"Failed opening excel file {filename}: " + str(e))
-            return results
-        for sheet in sheets:
+            log.warning("Failed opening excel file %s: %s", filename, e)
+            return
+        # Sheets parse concurrently, calamine releases the GIL while reading
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(sheets)))) as executor:
+            futures = [
+                executor.submit(
+                    pl.read_excel,
+                    workbook,
+                    sheet_name=sheet,
+                    engine="calamine",
+                    raise_if_empty=False,
+                )
+                for sheet in sheets
+            ]
+
+        # Collect in workbook order
+        for sheet, future in zip(sheets, futures):
             try:
-                df = pl.read_excel(filepath, sheet_name=sheet, raise_if_empty=False)
+                df = future.result()
                 filename_no_ext = Path(filepath).stem
                 sheet_identifier = f"{filename_no_ext}_{sheet}"
                 results.append((df, sheet_identifier))
-                print("Sheet extracted " + sheet)
+                log.debug("Sheet extracted %s", sheet)
 
             except Exception as e:
-                print(f"Failed extracting sheet {sheet}: {str(e)}")
+                log.warning("Failed extracting sheet %s: %s", sheet, e)
 
     elif extension == ".csv":
         try:
-            df = pl.read_csv(filepath)
+            lf = pl.scan_csv(filepath)
+            lf.collect_schema()  # surface header errors here, not mid-clean
             filename_no_ext = Path(filepath).stem
-            results.append((df, filename_no_ext))
-            print(f"CSV extracted {filename}")
+            results.append((lf, filename_no_ext))
+            log.debug("CSV extracted %s", filename)
         except Exception as e:
-            print(f"Failed reading CSV file {filename}: {str(e)}")
+            log.warning("Failed reading CSV file %s: %s", filename, e)
 
     elif extension == ".parquet":
         try:
-            df = pl.read_parquet(filepath)
+            lf = pl.scan_parquet(filepath)
+            lf.collect_schema()
             filename_no_ext = Path(filepath).stem
-            results.append((df, filename_no_ext))
-            print(f"Parquet extracted {filename}")
+            results.append((lf, filename_no_ext))
+            log.debug("Parquet extracted %s", filename)
         except Exception as e:
-            print(f"Failed reading Parquet file {filename}: {str(e)}")
+            log.warning("Failed reading Parquet file %s: %s", filename, e)
 
     else:
-        print(f"Skipping unknown file type: {filepath}")
-
-    # Filter and clean results before return
-    print("Cleaning Table Contents")
-    results = [
-        (df_clean_all(df), name)
-        for df, name in results
-        if df is not None and df.shape[1] > 0
-    ]
-
-    print(
-        f"Writing {len(results)} Tables: \n{str.join("\n", [name for df, name in results])}"
-    )
-    return results
+        log.info("Skipping unknown file type: %s", filepath)
+
+    # Clean each table and hand it on before starting the next
+    log.debug("Cleaning Table Contents")
+    n_cleaned = 0
+    for frame, name in results:
+        if frame is None or frame.collect_schema().len() == 0:
+            continue
+        try:
+            df = df_clean_all(frame)
+        except Exception as e:
+            # Scanned files only parse once cleaning collects them
+            log.warning("Failed cleaning table %s: %s", name, e)
+            continue
+        n_cleaned += 1
+        log.info("Cleaned table %s", name)
+        yield df, name
+
+    log.info("Extracted %d tables from %s", n_cleaned, filename)
+
+
+def _init_file_worker(config_path: str, log_queue, log_level: int) -> None:
+    # Ship records to the parent rather than contending on stdout
+    root = logging.getLogger()
+    root.handlers[:] = [QueueHandler(log_queue)]
+    root.setLevel(log_level)
+    app_config.init_config(config_path)
+
+
+def map_files_in_workers(fn: Callable[[str], T], filepaths: list[str]) -> Iterator[T]:
+    """Run fn on each file in its own worker process, yielding results in input order"""
+    if len(filepaths) <= 1:
+        yield from (fn(filepath) for filepath in filepaths)
+        return
+
+    # Spawn, polars' thread pool does not survive a fork
+    mp_context = multiprocessing.get_context("spawn")
+    log_queue = mp_context.Queue()
+    root = logging.getLogger()
+    listener = QueueListener(log_queue, *root.handlers)
+    listener.start()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(os.cpu_count() or 1, len(filepaths)),
+            mp_context=mp_context,
+            initializer=_init_file_worker,
+            initargs=(app_config.get_config_path(), log_queue, root.level),
+        ) as executor:
+            yield from executor.map(fn, filepaths, chunksize=1)
+    finally:
+        listener.stop()
+
+
+DEFAULT_READABLE_EXTENSIONS = frozenset([".parquet", ".csv", ".xlsx", ".json"])
 
 
 def list_readable_files(
     directory: str, extensions: list[str] | None = None
 ) -> list[str]:
-    if extensions is None:
-        extensions = [".parquet", ".csv", ".xlsx", ".json"]
+    ext_set = (
+        DEFAULT_READABLE_EXTENSIONS if extensions is None else frozenset(extensions)
+    )
 
     try:
-        path = Path(directory)
-        if not path.exists():
-            return []
-
-        files = []
-        for file in path.iterdir():
-            if file.is_file() and file.suffix.lower() in extensions:
-                files.append(file.name)
-
-        return sorted(files)
+        # DirEntry caches the type from the directory read, no stat per file
+        with os.scandir(directory) as entries:
+            return sorted(
+                entry.name
+                for entry in entries
+                if entry.is_file()
+                and os.path.splitext(entry.name)[1].lower() in ext_set
+            )
     except Exception:
         return []
 
@@ -106,32 +284,69 @@ def get_output_files() -> list[str]:
     return list_readable_files(output_dir)
 
 
-def read_dataframe(file_type: str, filename: str) -> Optional[pl.DataFrame]:
-    try:
-        if file_type == "Staging":
-            directory = app_config.get_str(app_config.ConfigKeys.DIR_DATA_STAGING)
-        elif file_type == "Output":
-            directory = app_config.get_str(app_config.ConfigKeys.DIR_DATA_OUTPUTS)
-        else:
+def _resolve_data_path(file_type: str, filename: str) -> Optional[Path]:
+    if file_type == "Staging":
+        directory = app_config.get_str(app_config.ConfigKeys.DIR_DATA_STAGING)
+    elif file_type == "Output":
+        directory = app_config.get_str(app_config.ConfigKeys.DIR_DATA_OUTPUTS)
+    else:
+        return None
+
+    file_path = Path(directory) / filename
+
+    if not file_path.exists():
+        return None
+
+    return file_path
+
+
+def get_data_file_mtime(file_type: str, filename: str) -> Optional[int]:
+    file_path = _resolve_data_path(file_type, filename)
+    if file_path is None:
+        return None
+    return file_path.stat().st_mtime_ns
+
+
+def _scan_data_file(file_path: Path) -> Optional[pl.LazyFrame]:
+    # Shared by both readers, so a file gets the same dtypes either way
+    strpath = str(file_path)
+    match file_path.suffix.lower():
+        case ".parquet":
+            return pl.scan_parquet(strpath)
+        case ".csv":
+            return pl.scan_csv(
+                strpath, try_parse_dates=True, infer_schema_length=10_000
+            )
+        case _:
             return None
 
-        file_path = Path(directory) / filename
 
-        if not file_path.exists():
+def read_lazyframe(file_type: str, filename: str) -> Optional[pl.LazyFrame]:
+    try:
+        file_path = _resolve_data_path(file_type, filename)
+        if file_path is None:
             return None
 
-        extension = file_path.suffix.lower()
-        strpath = str(file_path)
+        log.info("scanning dataframe %s", file_path)
+
+        return _scan_data_file(file_path)
+
+    except Exception:
+        return None
 
-        print("reading dataframe " + strpath)
 
-        match extension:
-            case ".parquet":
-                return pl.read_parquet(strpath)
-            case ".csv":
-                return pl.read_csv(strpath)
-            case _:
-                return None
+def read_dataframe(file_type: str, filename: str) -> Optional[pl.DataFrame]:
+    try:
+        file_path = _resolve_data_path(file_type, filename)
+        if file_path is None:
+            return None
+
+        log.info("reading dataframe %s", file_path)
+
+        lf = _scan_data_file(file_path)
+        if lf is None:
+            return None
+        return lf.collect(engine="streaming")
 
     except Exception:
         return None
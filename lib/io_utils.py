@@ -0,0 +1,20 @@
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+
+ORJSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def write_text(path: str | Path, text: str) -> None:
+    Path(path).write_text(text)
+
+
+def write_json(path: str | Path, obj: Any) -> None:
+    # Unknown objects (e.g. polars dtypes) fall back to their string form
+    Path(path).write_bytes(orjson.dumps(obj, option=ORJSON_OPTIONS, default=str))
+
+
+def read_json(path: str | Path) -> Any:
+    return orjson.loads(Path(path).read_bytes())
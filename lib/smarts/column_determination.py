@@ -1,5 +1,55 @@
+import math
 import polars as pl
-from itertools import combinations
+
+# Odd 64-bit multiplier, mixes the running hash before each column is folded in
+_HASH_MIX = 0x9E3779B97F4A7C15
+
+
+def _combo_hash(col_combo) -> pl.Expr:
+    """Fold per-column row hashes into a single UInt64 hash per row"""
+    combined = pl.col(col_combo[0])
+    for col in col_combo[1:]:
+        combined = (combined * pl.lit(_HASH_MIX, dtype=pl.UInt64)).xor(pl.col(col))
+    return combined
+
+
+def _iter_combos(n_columns: int, size: int, key_masks: list[int]):
+    """Yield index combinations in lexicographic order as (indices, bitmask),
+    skipping every branch whose prefix already contains a known key"""
+
+    def dfs(start: int, chosen: tuple, mask: int):
+        if len(chosen) == size:
+            yield chosen, mask
+            return
+        # Leave room for the columns still to be chosen
+        for i in range(start, n_columns - (size - len(chosen)) + 1):
+            next_mask = mask | (1 << i)
+            if any(key & next_mask == key for key in key_masks):
+                continue
+            yield from dfs(i + 1, chosen + (i,), next_mask)
+
+    yield from dfs(0, (), 0)
+
+
+def _confirm_unique(lf: pl.LazyFrame, combos: list) -> list[bool]:
+    """Exact full-frame uniqueness for each combination, one collect for all"""
+    if not combos:
+        return []
+    return list(
+        lf.select(
+            [
+                (
+                    (pl.col(combo[0]) if len(combo) == 1 else pl.struct(list(combo)))
+                    .n_unique()
+                    == pl.len()
+                ).alias(f"combo_{i}")
+                for i, combo in enumerate(combos)
+            ]
+        )
+        .collect()
+        .row(0)
+    )
+
 
 def find_ranked_composite_keys(
     df: pl.DataFrame,
@@ -28,34 +78,83 @@ def find_ranked_composite_keys(
     if not eligible_columns:
         return []
 
+    # Full-frame distinct count per column, one parallel pass
+    unique_counts = dict(
+        zip(
+            eligible_columns,
+            df.select([pl.col(col).n_unique() for col in eligible_columns]).row(0),
+        )
+    )
+
+    # Scores are additive per column, so score each column once and sum
+    column_scores = {
+        col: calculate_preference_score([col], prefer_patterns)
+        for col in eligible_columns
+    }
+
+    # Check single columns first, best-named first, and return the first
+    # key found - a column is a key exactly when every value is distinct
+    ranked_columns = sorted(eligible_columns, key=lambda col: -column_scores[col])
+    for col in ranked_columns:
+        if unique_counts[col] == total_rows:
+            return [[col]]
+
+    # A constant column never changes whether a combination is unique
+    if total_rows > 1:
+        eligible_columns = [col for col in eligible_columns if unique_counts[col] > 1]
+
     sample_df = df.sample(min(sample_size, total_rows))
 
-    # Check single columns first - return immediately if found
-    single_column_candidates = []
-    for col in eligible_columns:
-        unique_count = sample_df.select([col]).unique().height
-        if unique_count == sample_df.height:
-            full_unique_count = df.select([col]).unique().height
-            if full_unique_count == total_rows:
-                score = calculate_preference_score([col], prefer_patterns)
-                single_column_candidates.append(([col], 1, score))
-
-    # If we found single-column keys, return the best one immediately
-    if single_column_candidates:
-        single_column_candidates.sort(key=lambda x: -x[2])
-        return [single_column_candidates[0][0]]
+    # Hash each sample column once, combinations then only fold and count hashes
+    sample_hashes = sample_df.select(
+        [pl.col(col).hash(seed=0) for col in eligible_columns]
+    )
+
+    # Full-frame confirmations share one lazy plan, counted in one pass rather
+    # than materialising a deduplicated copy per combination
+    df_lazy = df.lazy()
+
+    # Confirmed keys as column bitmasks, any superset of one is unique too
+    # and never worth testing
+    key_masks: list[int] = []
 
     # Only check multi-column combinations if no single column works
     for size in range(2, min(max_key_size + 1, len(eligible_columns) + 1)):
         size_candidates = []
 
-        for col_combo in combinations(eligible_columns, size):
-            unique_count = sample_df.select(col_combo).unique().height
-            if unique_count == sample_df.height:
-                full_unique_count = df.select(col_combo).unique().height
-                if full_unique_count == total_rows:
-                    score = calculate_preference_score(col_combo, prefer_patterns)
-                    size_candidates.append((list(col_combo), size, score))
+        # Every combination of this size counted in one parallel select
+        size_combos = []
+        size_masks = []
+        for indices, mask in _iter_combos(len(eligible_columns), size, key_masks):
+            col_combo = tuple(eligible_columns[i] for i in indices)
+            # Distinct combinations can't exceed the product of distinct values
+            if math.prod(unique_counts[col] for col in col_combo) >= total_rows:
+                size_combos.append(col_combo)
+                size_masks.append(mask)
+        if not size_combos:
+            continue
+        combo_unique_counts = sample_hashes.select(
+            [
+                _combo_hash(col_combo).n_unique().alias(f"combo_{i}")
+                for i, col_combo in enumerate(size_combos)
+            ]
+        ).row(0)
+
+        sample_passed = [
+            (col_combo, mask)
+            for col_combo, mask, unique_count in zip(
+                size_combos, size_masks, combo_unique_counts
+            )
+            if unique_count == sample_df.height
+        ]
+        confirmed = _confirm_unique(
+            df_lazy, [col_combo for col_combo, _ in sample_passed]
+        )
+        for (col_combo, mask), is_unique in zip(sample_passed, confirmed):
+            if is_unique:
+                key_masks.append(mask)
+                score = sum(column_scores[col] for col in col_combo)
+                size_candidates.append((list(col_combo), size, score))
 
         if size_candidates:
             # Sort by preference score descending for this size
@@ -71,10 +170,27 @@ def find_ranked_composite_keys(
 
 def _filter_decimal_columns(df: pl.DataFrame, columns: list) -> list:
     """Filter out columns containing decimal values, keep integers and non-numeric"""
-    eligible = []
+    schema = df.schema
+    float_columns = [col for col in columns if schema[col] in [pl.Float32, pl.Float64]]
+
+    # Check the leading 1000 non-null values of every float column in one pass,
+    # integral and finite throughout means the floats are really integers
+    float_is_integral = {}
+    if float_columns:
+        probes = []
+        for col in float_columns:
+            values = pl.col(col).drop_nulls().head(1000)
+            probes.append(
+                (
+                    (values.len() > 0)
+                    & ((values == values.floor()) & values.is_finite()).all()
+                ).alias(col)
+            )
+        float_is_integral = df.select(probes).row(0, named=True)
 
+    eligible = []
     for col in columns:
-        dtype = df[col].dtype
+        dtype = schema[col]
 
         # Keep non-numeric columns
         if not dtype.is_numeric():
@@ -83,11 +199,7 @@ def _filter_decimal_columns(df: pl.DataFrame, columns: list) -> list:
 
         # For numeric columns, check if they contain decimals
         if dtype in [pl.Float32, pl.Float64]:
-            # Sample to check if values are actually integers
-            sample_values = df[col].drop_nulls().head(1000).to_list()
-            if sample_values and all(
-                float(val).is_integer() for val in sample_values if val is not None
-            ):
+            if float_is_integral[col]:
                 eligible.append(col)
         elif dtype in [
             pl.Int8,
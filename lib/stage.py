@@ -1,43 +1,186 @@
+import logging
 import os
+import queue
 import re
-import glob
 import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 import polars as pl
 
 import app_config
-from lib.files import extract_dataframes
+from lib.files import iter_dataframes, map_files_in_workers, prune_extract_cache
 
 
-def write_staging(df: pl.DataFrame, filename: str):
-    staging_dir = app_config.get_str(app_config.ConfigKeys.DIR_DATA_STAGING)
-    Path(staging_dir).mkdir(parents=True, exist_ok=True)
-    filepath = os.path.join(staging_dir, f"{filename}.parquet")
-    print(f"Writing staging file {filename}")
-    df.write_parquet(filepath)
+log = logging.getLogger(__name__)
 
+# Characters stripped from table identifiers to form staging file names
+_STAGING_NAME_UNSAFE_RE = re.compile(r"[\s\$\.]")
 
-# Delete & recreate the staging directory
-def staging_reset() -> None:
-    staging_dir = app_config.get_str(app_config.ConfigKeys.DIR_DATA_STAGING)
-    shutil.rmtree(staging_dir, ignore_errors=True)
-    Path(staging_dir).mkdir(parents=True, exist_ok=True)
+
+def _staging_dir() -> Path:
+    return Path(app_config.get_str(app_config.ConfigKeys.DIR_DATA_STAGING))
+
+
+def write_staging(df: pl.DataFrame, filename: str, staging_dir: Path | None = None):
+    # Callers writing many tables resolve and create the directory once
+    if staging_dir is None:
+        staging_dir = _staging_dir()
+        staging_dir.mkdir(parents=True, exist_ok=True)
+    filepath = staging_dir / f"{filename}.parquet"
+    log.info("Writing staging file %s", filename)
+    # Fast zstd level, staging is always read whole so row group stats go unused
+    df.write_parquet(
+        filepath,
+        compression="zstd",
+        compression_level=1,
+        statistics=False,
+        row_group_size=1_000_000,
+    )
+
+
+def _sibling_dir(staging_dir: Path, suffix: str) -> Path:
+    return staging_dir.with_name(staging_dir.name + suffix)
+
+
+def _fsync_dir(path: Path) -> None:
+    # Directories can't be opened for fsync on every platform, best effort only
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# Create a fresh build directory beside staging, the live one stays readable
+def staging_build_dir() -> Path:
+    build_dir = _sibling_dir(_staging_dir(), ".new")
+    shutil.rmtree(build_dir, ignore_errors=True)
+    build_dir.mkdir(parents=True, exist_ok=True)
+    return build_dir
+
+
+def _staging_swap(build_dir: Path) -> None:
+    """Swap the built directory in for the live staging one with two renames.
+    Staging is briefly missing between them, never half written"""
+    staging_dir = _staging_dir()
+    old_dir = _sibling_dir(staging_dir, ".old")
+    _fsync_dir(build_dir)
+
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if staging_dir.exists():
+        os.replace(staging_dir, old_dir)
+    os.replace(build_dir, staging_dir)
+
+    # Old tables are deleted off the critical path
+    threading.Thread(
+        target=shutil.rmtree, args=(old_dir,), kwargs={"ignore_errors": True}
+    ).start()
+
+
+# Cleaned tables allowed to wait for the writer, caps memory if writes stall
+STAGING_WRITE_QUEUE_SIZE = 2
+
+
+def _stage_file(filepath: str, staging_dir: Path) -> tuple[Path, list[str]]:
+    # Runs in a worker, so parsing, cleaning and the parquet write all stay
+    # there and only the staged names travel back to the parent.
+    # Tables land in a private directory, two inputs can share a staging name
+    # and must never write the same path at once
+    file_dir = Path(tempfile.mkdtemp(prefix=".stage-", dir=staging_dir))
+    # The next table is parsed and cleaned while the previous one is written
+    tables: queue.Queue = queue.Queue(maxsize=STAGING_WRITE_QUEUE_SIZE)
+    filenames = []
+
+    def write_tables() -> None:
+        error = None
+        while (item := tables.get()) is not None:
+            # Keep draining after a failure so the producer never blocks
+            if error is None:
+                try:
+                    write_staging(*item, file_dir)
+                    filenames.append(item[1])
+                except Exception as e:
+                    error = e
+        if error is not None:
+            raise error
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        writer = executor.submit(write_tables)
+        try:
+            for df, identifier in iter_dataframes(filepath):
+                tables.put((df, _STAGING_NAME_UNSAFE_RE.sub("", identifier)))
+        finally:
+            tables.put(None)
+        writer.result()
+    # A repeated name within the file was overwritten in place, list it once
+    return file_dir, list(dict.fromkeys(filenames))
+
+
+# Streamlit reruns run on their own threads, and a second refresh would
+# delete the build directory while the first is swapping it in
+_refresh_lock = threading.Lock()
 
 
 def stagefiles_refresh() -> None:
-    staging_reset()
+    with _refresh_lock:
+        _stagefiles_refresh()
 
-    data_sources_dir = app_config.get_str(app_config.ConfigKeys.DIR_DATA_INPUTS)
-    for filepath in glob.glob(os.path.join(data_sources_dir, "*")):
-        dataframes = extract_dataframes(filepath)
 
-        for df, identifier in dataframes:
-            filename = re.sub(r"[\s\$\.]", "", identifier)
-            write_staging(df, filename)
+def _stagefiles_refresh() -> None:
+    build_dir = staging_build_dir()
+
+    data_sources_dir = app_config.get_str(app_config.ConfigKeys.DIR_DATA_INPUTS)
+    # Hidden entries skipped, as a shell glob would
+    try:
+        with os.scandir(data_sources_dir) as entries:
+            filepaths = sorted(
+                entry.path
+                for entry in entries
+                if entry.is_file() and not entry.name.startswith(".")
+            )
+    except FileNotFoundError:
+        filepaths = []
+    staged: dict[str, str] = {}
+    for filepath, (file_dir, filenames) in zip(
+        filepaths,
+        map_files_in_workers(partial(_stage_file, staging_dir=build_dir), filepaths),
+    ):
+        # Moved in input order, so a shared name keeps the last input's table
+        # as it did when files were staged one after another
+        for filename in filenames:
+            if filename in staged:
+                log.warning(
+                    "Staging name %s from %s replaces the one from %s",
+                    filename,
+                    filepath,
+                    staged[filename],
+                )
+            os.replace(
+                file_dir / f"{filename}.parquet", build_dir / f"{filename}.parquet"
+            )
+            staged[filename] = filepath
+        file_dir.rmdir()
+    _staging_swap(build_dir)
+    # Entries for edited or removed inputs would otherwise pile up forever
+    prune_extract_cache(filepaths)
+    log.info("Staged %d tables", len(staged))
 
 
 def stagefiles_ensure() -> None:
-    staging_dir = app_config.get_str(app_config.ConfigKeys.DIR_DATA_STAGING)
-    staging_path = Path(staging_dir)
-    if not staging_path.exists() or not any(glob.glob(os.path.join(staging_dir, "*"))):
-        stagefiles_refresh()
+    # Checked under the lock, so a refresh mid-swap is waited for, not repeated
+    with _refresh_lock:
+        try:
+            with os.scandir(_staging_dir()) as entries:
+                is_empty = next(entries, None) is None
+        except FileNotFoundError:
+            is_empty = True
+        if is_empty:
+            _stagefiles_refresh()
@@ -1,8 +1,8 @@
 import streamlit as st
 import polars as pl
 from pygwalker.api.streamlit import StreamlitRenderer
-from lib.config import get_setting, Config
 from lib.files import (
+    get_data_file_mtime,
     get_staging_files,
     get_output_files,
     read_dataframe,
@@ -15,6 +15,42 @@ import warnings
 st.set_option("client.showErrorDetails", False)
 warnings.simplefilter("ignore")
 
+# Cached per file version, the mtime argument invalidates entries on refresh.
+# Superseded versions are never requested again, so entries are capped and
+# expire rather than holding every refreshed frame for the server's lifetime
+EXPLORER_CACHE_MAX_ENTRIES = 8
+EXPLORER_CACHE_TTL = "1h"
+
+
+@st.cache_data(
+    show_spinner=False, max_entries=EXPLORER_CACHE_MAX_ENTRIES, ttl=EXPLORER_CACHE_TTL
+)
+def load_dataframe(data_type: str, filename: str, mtime_ns: int | None):
+    return read_dataframe(data_type, filename)
+
+
+@st.cache_data(
+    show_spinner=False, max_entries=EXPLORER_CACHE_MAX_ENTRIES, ttl=EXPLORER_CACHE_TTL
+)
+def load_summary(data_type: str, filename: str, mtime_ns: int | None):
+    return describe_with_dtypes(load_dataframe(data_type, filename, mtime_ns))
+
+
+@st.cache_resource(
+    show_spinner=False, max_entries=EXPLORER_CACHE_MAX_ENTRIES, ttl=EXPLORER_CACHE_TTL
+)
+def load_renderer(data_type: str, filename: str, mtime_ns: int | None):
+    df = load_dataframe(data_type, filename, mtime_ns)
+    # Polars frames go in directly, kernel computation reads their Arrow
+    # buffers without a pandas copy
+    return StreamlitRenderer(
+        df,
+        default_tab="data",
+        spec_io_mode="rw",
+        kernel_computation=True,
+    )
+
+
 # Page Title & Contents
 set_page_title("📊 Data Explorer")
 st.write("Select which data set to explore")
@@ -38,22 +74,18 @@ with source_col:
 # Load dataframe for selected file
 if selected_file:
     st.write(f"Debug: Loading {data_type} - {selected_file}")
-    df = read_dataframe(data_type, selected_file)
+    mtime_ns = get_data_file_mtime(data_type, selected_file)
+    df = load_dataframe(data_type, selected_file, mtime_ns)
 
     # Display data
     if df is not None and selected_file:
         st.subheader("PyGWalker Data Visualisation")
 
-        pyg_app = StreamlitRenderer(
-            df.to_pandas(),
-            default_tab="data",
-            spec_io_mode="rw",
-            kernel_computation=True,
-        )
+        pyg_app = load_renderer(data_type, selected_file, mtime_ns)
         pyg_app.explorer()
 
         st.subheader("Aggregate Summary")
-        st.dataframe(describe_with_dtypes(df))
+        st.dataframe(load_summary(data_type, selected_file, mtime_ns))
     elif selected_file:
         st.error(f"Failed to load {selected_file}")
     else: